@@ -12,7 +12,7 @@ trainer = dict(
 loss = "dice"
 mask_lc = True
 evaluation = dict(
-    precision=16,
+    precision="bf16",
     accelerator="gpu",
     strategy=None,
     devices=1,
@@ -31,5 +31,5 @@ model = dict(
     ),
     # model training and testing settings
     train_cfg=dict(),
-    test_cfg=dict(mode="whole"),
+    test_cfg=dict(mode="whole", align_corners=False),
 )
@@ -34,5 +34,5 @@ model = dict(
         loss_decode=None,
     ),
     train_cfg=dict(),
-    test_cfg=dict(),
+    test_cfg=dict(align_corners=False),
 )
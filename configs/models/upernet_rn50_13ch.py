@@ -30,5 +30,5 @@ model = dict(
         align_corners=False,
     ),
     train_cfg=dict(),
-    test_cfg=dict(mode="whole"),
+    test_cfg=dict(mode="whole", align_corners=False),
 )
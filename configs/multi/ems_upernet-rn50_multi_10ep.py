@@ -5,7 +5,7 @@ _base_ = [
 name = "upernet-rn50_multi_imnet_100ep"
 trainer = dict(
     max_epochs=10,
-    precision=16,
+    precision="bf16",
     accelerator="gpu",
     strategy=None,
     devices=1,
@@ -5,7 +5,7 @@ _base_ = [
 name = "segformer-mit-b3_multi_no_pre_auxv2_50ep"
 trainer = dict(
     max_epochs=50,
-    precision=16,
+    precision="bf16",
     accelerator="gpu",
     strategy=None,
     devices=1,
@@ -16,7 +16,7 @@ data = dict(
     num_workers=8,
 )
 evaluation = dict(
-    precision=16,
+    precision="bf16",
     accelerator="gpu",
     strategy=None,
     devices=1,
@@ -5,7 +5,7 @@ _base_ = [
 name = "segformer-mit-b3_single_imnet_100ep"
 trainer = dict(
     max_epochs=100,
-    precision=16,
+    precision="bf16",
     accelerator="gpu",
     strategy=None,
     devices=1,
@@ -16,7 +16,7 @@ data = dict(
     num_workers=8,
 )
 evaluation = dict(
-    precision=16,
+    precision="bf16",
     accelerator="gpu",
     strategy=None,
     devices=1,
@@ -5,7 +5,7 @@ _base_ = [
 name = "segformer-mit-b3_single_imnet_dice_loss_10ep"
 trainer = dict(
     max_epochs=50,
-    precision=16,
+    precision="bf16",
     accelerator="gpu",
     strategy=None,
     devices=1,
@@ -17,7 +17,7 @@ data = dict(
 )
 loss = "dice"
 evaluation = dict(
-    precision=16,
+    precision="bf16",
     accelerator="gpu",
     strategy=None,
     devices=1,
@@ -5,14 +5,14 @@ _base_ = [
 name = "upernet-rn50_single_imnet_dice_loss_10ep"
 trainer = dict(
     max_epochs=10,
-    precision=16,
+    precision="bf16",
     accelerator="gpu",
     strategy=None,
     devices=1,
 )
 loss = "dice"
 evaluation = dict(
-    precision=16,
+    precision="bf16",
     accelerator="gpu",
     strategy=None,
     devices=1,
@@ -87,6 +87,7 @@ class EMSDataModule(LightningDataModule):
             batch_size=self.batch_size_train,
             num_workers=self.num_workers,
             pin_memory=True,
+            persistent_workers=self.num_workers > 0,
         )
 
     def val_dataloader(self):
@@ -99,6 +100,7 @@ class EMSDataModule(LightningDataModule):
             batch_size=self.batch_size_eval,
             num_workers=self.num_workers,
             pin_memory=True,
+            persistent_workers=self.num_workers > 0,
         )
 
     def test_dataloader(self):
@@ -111,6 +113,7 @@ class EMSDataModule(LightningDataModule):
             batch_size=self.batch_size_eval,
             num_workers=self.num_workers,
             pin_memory=True,
+            persistent_workers=self.num_workers > 0,
         )
 
     def predict_dataloader(self):
@@ -120,4 +123,5 @@ class EMSDataModule(LightningDataModule):
             batch_size=1,
             num_workers=self.num_workers,
             pin_memory=True,
+            persistent_workers=self.num_workers > 0,
         )
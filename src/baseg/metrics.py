@@ -0,0 +1,39 @@
+from typing import Any, Optional
+
+import torch
+from torchmetrics import Metric
+
+
+class ConfusionMatrix(Metric):
+    """Integer confusion matrix, accumulated with a single scatter-add per update.
+    Rows index the targets and columns the predictions. Pixels marked with `ignore_index`
+    are routed to an extra bin that is dropped, so that no boolean compaction is required.
+    """
+
+    is_differentiable = False
+    higher_is_better = None
+    full_state_update = False
+
+    def __init__(self, num_classes: int, ignore_index: Optional[int] = None, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.num_classes = num_classes
+        self.ignore_index = ignore_index
+        self.add_state(
+            "confmat",
+            default=torch.zeros(num_classes, num_classes, dtype=torch.long),
+            dist_reduce_fx="sum",
+        )
+
+    def update(self, preds: torch.Tensor, target: torch.Tensor) -> None:
+        """Update the confusion matrix with hard predictions and targets of the same shape."""
+        num_bins = self.num_classes**2
+        index = target.long() * self.num_classes + preds.long()
+        if self.ignore_index is not None:
+            index = index.masked_fill(target == self.ignore_index, num_bins)
+        # unlike bincount, scatter_add does not need to sync with the host to size its output
+        index = index.flatten()
+        counts = index.new_zeros(num_bins + 1).scatter_add_(0, index, index.new_ones(()).expand_as(index))
+        self.confmat += counts[:num_bins].view(self.num_classes, self.num_classes)
+
+    def compute(self) -> torch.Tensor:
+        return self.confmat
@@ -18,15 +18,23 @@ class CustomEncoderDecoder(EncoderDecoder):
 
         Returns:
             Tensor: Forward output of model without any post-processes.
+                During training, logits are kept at the head resolution and
+                the targets are expected to be resized to match them.
+                Auxiliary logits are always kept at the head resolution.
         """
         x = self.extract_feat(inputs)
         feat = self.decode_head(x)
         out = self.decode_head.cls_seg(feat)
-        out = F.interpolate(out, size=inputs.shape[2:], mode="bilinear", align_corners=True)
+        if not self.training:
+            # half-pixel sampling (align_corners=False) matches the nearest-exact targets used in training,
+            # configs without the option come from experiments trained with full resolution, aligned logits
+            align_corners = (self.test_cfg or {}).get("align_corners", True)
+            out = F.interpolate(out, size=inputs.shape[2:], mode="bilinear", align_corners=align_corners)
 
         if self.decode_head.has_aux_output():
+            # the auxiliary outputs only feed a loss and argmax-based metrics,
+            # no need for an expensive bilinear upsample over every class
             aux = self.decode_head.cls_seg_aux(feat)
-            aux = F.interpolate(aux, size=inputs.shape[2:], mode="bilinear", align_corners=True)
             return out, aux
 
         return out
@@ -3,10 +3,9 @@ from typing import Any, Callable, Optional
 
 import torch
 from pytorch_lightning import LightningModule
-from torch import nn
 from torch.optim import AdamW
-from torchmetrics import F1Score, JaccardIndex
 
+from baseg.metrics import ConfusionMatrix
 from baseg.models import build_model
 
 
@@ -16,30 +15,23 @@ class BaseModule(LightningModule):
         config: dict,
         tiler: Optional[Callable] = None,
         predict_callback: Optional[Callable] = None,
+        compile_model: bool = False,
     ):
         super().__init__()
-        self.model = build_model(config)
+        # NHWC lets cuDNN pick the faster tensor core kernels for convolutions and bilinear upsampling
+        self.model = build_model(config).to(memory_format=torch.channels_last)
         self.model.cfg = config
+        if compile_model:
+            # only the forward is compiled, so that the state dict keys match the ones of the eager model
+            self.model.forward = torch.compile(self.model.forward, mode="reduce-overhead", dynamic=False)
         self.tiler = tiler
         self.predict_callback = predict_callback
-        self.train_metrics = nn.ModuleDict(
-            {
-                "train_f1": F1Score(task="binary", ignore_index=255, average="macro"),
-                "train_iou": JaccardIndex(task="binary", ignore_index=255, average="macro"),
-            }
-        )
-        self.val_metrics = nn.ModuleDict(
-            {
-                "val_f1": F1Score(task="binary", ignore_index=255, average="macro"),
-                "val_iou": JaccardIndex(task="binary", ignore_index=255, average="macro"),
-            }
-        )
-        self.test_metrics = nn.ModuleDict(
-            {
-                "test_f1": F1Score(task="binary", ignore_index=255, average="macro"),
-                "test_iou": JaccardIndex(task="binary", ignore_index=255, average="macro"),
-            }
-        )
+        # F1 and IoU share the same TP/FP/FN counts: accumulate them once, derive the scores at epoch end
+        self.train_metrics = ConfusionMatrix(num_classes=2, ignore_index=255)
+        self.val_metrics = ConfusionMatrix(num_classes=2, ignore_index=255)
+        self.test_metrics = ConfusionMatrix(num_classes=2, ignore_index=255)
+        # side CUDA stream for the metric updates, created lazily once the module is on the GPU
+        self._metric_stream: Optional[torch.cuda.Stream] = None
 
     def init_pretrained(self) -> None:
         assert self.model.cfg, "Model config is not set"
@@ -49,5 +41,74 @@ class BaseModule(LightningModule):
             return
         self.model.backbone.load_state_dict(torch.load(config.pretrained), strict=False)   
 
+    def on_after_batch_transfer(self, batch: Any, dataloader_idx: int) -> Any:
+        """Convert the input to channels-last in the batch held by Lightning, right after the device transfer.
+        The NCHW tensor is replaced instead of being copied alongside, so that it can be freed before the
+        backward pass with any strategy: DDP hands a shallow copy of this dict to the step functions.
+        """
+        batch["S2L2A"] = batch["S2L2A"].contiguous(memory_format=torch.channels_last)
+        return batch
+
+    def resize_target(self, target: torch.Tensor, logits: torch.Tensor) -> torch.Tensor:
+        """Resize the target (N, H, W) to the spatial size of the logits, using nearest-exact interpolation.
+        Also used to upsample low resolution predictions to the size of the targets: nearest-exact follows
+        the same half-pixel convention as the bilinear upsample of the model outputs (test_cfg.align_corners=False).
+        Pixels are gathered by index rather than with F.interpolate, which does not support long tensors on GPU.
+        """
+        if target.shape[-2:] == logits.shape[-2:]:
+            return target
+        (in_h, in_w), (out_h, out_w) = target.shape[-2:], logits.shape[-2:]
+        # sample the pixel at the center of each output cell, as in F.interpolate(mode="nearest-exact")
+        rows = (2 * torch.arange(out_h, device=target.device) + 1) * in_h // (2 * out_h)
+        cols = (2 * torch.arange(out_w, device=target.device) + 1) * in_w // (2 * out_w)
+        return target[:, rows.unsqueeze(1), cols]
+
+    def decode_loss(self, decode_out: torch.Tensor, y_del: torch.Tensor) -> torch.Tensor:
+        """Compute the delineation loss on (N, H, W) logits in full precision, outside of mixed precision autocast."""
+        with torch.autocast(device_type=self.device.type, enabled=False):
+            return self.criterion_decode(decode_out.float(), y_del.float())
+
+    def update_metric(self, metric: ConfusionMatrix, preds: torch.Tensor, target: torch.Tensor) -> None:
+        """Update the metric on a side CUDA stream, so that it overlaps with the rest of the step."""
+        if self.device.type != "cuda":
+            metric.update(preds, target)
+            return
+        if self._metric_stream is None:
+            self._metric_stream = torch.cuda.Stream(device=self.device)
+        self._metric_stream.wait_stream(torch.cuda.current_stream(self.device))
+        with torch.cuda.stream(self._metric_stream):
+            # inputs come from the main stream: keep their memory alive until the side stream is done with them
+            preds.record_stream(self._metric_stream)
+            target.record_stream(self._metric_stream)
+            metric.update(preds, target)
+
+    def log_scores(self, metric: ConfusionMatrix, prefix: str, suffix: str = "", binary: bool = False) -> None:
+        """Log F1 and IoU from the accumulated confusion matrix, then reset it.
+        Binary scores refer to the positive class, otherwise they are macro-averaged over the classes.
+        """
+        if self._metric_stream is not None:
+            torch.cuda.current_stream(self.device).wait_stream(self._metric_stream)
+        confmat = metric.compute()
+        tp = confmat.diag()
+        fp = confmat.sum(dim=0) - tp
+        fn = confmat.sum(dim=1) - tp
+        if binary:
+            tp, fp, fn = tp[1:], fp[1:], fn[1:]
+        f1 = (2 * tp / (2 * tp + fp + fn)).nanmean().nan_to_num(0.0)
+        iou = (tp / (tp + fp + fn)).nanmean().nan_to_num(0.0)
+        self.log_dict({f"{prefix}_f1{suffix}": f1, f"{prefix}_iou{suffix}": iou}, prog_bar=True)
+        metric.reset()
+
+    def on_train_epoch_end(self) -> None:
+        self.log_scores(self.train_metrics, "train", binary=True)
+
+    def on_validation_epoch_end(self) -> None:
+        self.log_scores(self.val_metrics, "val", binary=True)
+
+    def on_test_epoch_end(self) -> None:
+        self.log_scores(self.test_metrics, "test", binary=True)
+
     def configure_optimizers(self) -> Any:
-        return AdamW(self.parameters(), lr=1e-4, weight_decay=1e-4)
+        # update every parameter with a single fused kernel when they all live on the GPU
+        fused = all(param.is_cuda for param in self.parameters())
+        return AdamW(self.parameters(), lr=1e-4, weight_decay=1e-4, fused=fused, foreach=not fused)
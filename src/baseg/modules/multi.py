@@ -3,9 +3,9 @@ from typing import Any, Callable
 import torch
 from loguru import logger
 from torch import nn
-from torchmetrics import F1Score, JaccardIndex
 
 from baseg.losses import DiceLoss, SoftBCEWithLogitsLoss
+from baseg.metrics import ConfusionMatrix
 from baseg.modules.base import BaseModule
 
 
@@ -17,9 +17,9 @@ class MultiTaskModule(BaseModule):
         predict_callback: Callable[..., Any] | None = None,
         mask_lc: bool = False,
         loss: str = "bce",
-        
+        compile_model: bool = False,
     ):
-        super().__init__(config, tiler, predict_callback)
+        super().__init__(config, tiler, predict_callback, compile_model)
         if loss == "bce":
             self.criterion_decode = SoftBCEWithLogitsLoss(ignore_index=255)
         else:
@@ -30,53 +30,37 @@ class MultiTaskModule(BaseModule):
         num_classes = config.decode_head.aux_classes
         logger.info(f"auxiliary factor: {self.aux_factor}")
         logger.info(f"auxiliary classes: {num_classes}")
-        self.train_metrics_aux = nn.ModuleDict(
-            {
-                "train_f1_aux": F1Score(task="multiclass", ignore_index=255, num_classes=num_classes, average="macro"),
-                "train_iou_aux": JaccardIndex(
-                    task="multiclass", ignore_index=255, num_classes=num_classes, average="macro"
-                ),
-            }
-        )
-        self.val_metrics_aux = nn.ModuleDict(
-            {
-                "val_f1_aux": F1Score(task="multiclass", ignore_index=255, num_classes=num_classes, average="macro"),
-                "val_iou_aux": JaccardIndex(
-                    task="multiclass", ignore_index=255, num_classes=num_classes, average="macro"
-                ),
-            }
-        )
-        self.test_metrics_aux = nn.ModuleDict(
-            {
-                "test_f1_aux": F1Score(task="multiclass", ignore_index=255, num_classes=num_classes, average="macro"),
-                "test_iou_aux": JaccardIndex(
-                    task="multiclass", ignore_index=255, num_classes=num_classes, average="macro"
-                ),
-            }
-        )
+        self.train_metrics_aux = ConfusionMatrix(num_classes, ignore_index=255)
+        self.val_metrics_aux = ConfusionMatrix(num_classes, ignore_index=255)
+        self.test_metrics_aux = ConfusionMatrix(num_classes, ignore_index=255)
 
     def training_step(self, batch: Any, batch_idx: int):
         x = batch["S2L2A"]
         y_del = batch["DEL"]
         y_lc = batch["ESA_LC"]
         if self.mask_lc:
-            y_lc[y_del == 1] = 255
+            y_lc = y_lc.masked_fill(y_del == 1, 255)
         decode_out, auxiliary_out = self.model(x)
-        loss_decode = self.criterion_decode(decode_out.squeeze(1), y_del.float())
-        loss_auxiliary = self.criterion_auxiliary(auxiliary_out, y_lc.long())
+        decode_out = decode_out.squeeze(1)
+        y_del = self.resize_target(y_del, decode_out)
+        y_lc = self.resize_target(y_lc, decode_out).long()
+        loss_decode = self.decode_loss(decode_out, y_del)
+        loss_auxiliary = self.criterion_auxiliary(auxiliary_out, self.resize_target(y_lc, auxiliary_out))
         loss = loss_decode + self.aux_factor * loss_auxiliary
 
-        self.log("train_loss_del", loss_decode, on_step=True, on_epoch=True, prog_bar=True, logger=True)
-        self.log("train_loss_aux", loss_auxiliary, on_step=True, on_epoch=True, prog_bar=True, logger=True)
-        self.log("train_loss", loss, on_step=True, on_epoch=True, prog_bar=True, logger=True)
+        self.log_dict(
+            {"train_loss_del": loss_decode, "train_loss_aux": loss_auxiliary, "train_loss": loss},
+            on_step=False,
+            on_epoch=True,
+            prog_bar=True,
+            batch_size=x.shape[0],
+        )
         # compute delineation metrics
-        for metric_name, metric in self.train_metrics.items():
-            metric(decode_out.squeeze(1), y_del.float())
-            self.log(metric_name, metric, on_epoch=True, prog_bar=True)
+        preds_del = decode_out > 0
+        self.update_metric(self.train_metrics, preds_del, y_del)
         # compute auxiliary metrics
-        for metric_name, metric in self.train_metrics_aux.items():
-            metric(auxiliary_out, y_lc.long())
-            self.log(metric_name, metric, on_epoch=True, prog_bar=True)
+        preds_lc = self.resize_target(auxiliary_out.argmax(1), decode_out)
+        self.update_metric(self.train_metrics_aux, preds_lc, y_lc)
         return loss
 
     def validation_step(self, batch: Any, batch_idx: int):
@@ -84,23 +68,28 @@ class MultiTaskModule(BaseModule):
         y_del = batch["DEL"]
         y_lc = batch["ESA_LC"]
         if self.mask_lc:
-            y_lc[y_del == 1] = 255
+            y_lc = y_lc.masked_fill(y_del == 1, 255)
         decode_out, auxiliary_out = self.model(x)
-        loss_decode = self.criterion_decode(decode_out.squeeze(1), y_del.float())
-        loss_auxiliary = self.criterion_auxiliary(auxiliary_out, y_lc.long())
+        decode_out = decode_out.squeeze(1)
+        y_del = self.resize_target(y_del, decode_out)
+        y_lc = self.resize_target(y_lc, decode_out).long()
+        loss_decode = self.decode_loss(decode_out, y_del)
+        loss_auxiliary = self.criterion_auxiliary(auxiliary_out, self.resize_target(y_lc, auxiliary_out))
         loss = loss_decode + self.aux_factor * loss_auxiliary
 
-        self.log("val_loss_del", loss_decode, on_step=True, on_epoch=True, prog_bar=True, logger=True)
-        self.log("val_loss_aux", loss_auxiliary, on_step=True, on_epoch=True, prog_bar=True, logger=True)
-        self.log("val_loss", loss, on_step=True, on_epoch=True, prog_bar=True, logger=True)
+        self.log_dict(
+            {"val_loss_del": loss_decode, "val_loss_aux": loss_auxiliary, "val_loss": loss},
+            on_step=False,
+            on_epoch=True,
+            prog_bar=True,
+            batch_size=x.shape[0],
+        )
         # compute delineation metrics
-        for metric_name, metric in self.val_metrics.items():
-            metric(decode_out.squeeze(1), y_del.float())
-            self.log(metric_name, metric, on_epoch=True, prog_bar=True)
+        preds_del = decode_out > 0
+        self.update_metric(self.val_metrics, preds_del, y_del)
         # compute auxiliary metrics
-        for metric_name, metric in self.val_metrics_aux.items():
-            metric(auxiliary_out, y_lc.long())
-            self.log(metric_name, metric, on_epoch=True, prog_bar=True)
+        preds_lc = self.resize_target(auxiliary_out.argmax(1), decode_out)
+        self.update_metric(self.val_metrics_aux, preds_lc, y_lc)
         return loss
 
     def test_step(self, batch: Any, batch_idx: int):
@@ -108,25 +97,42 @@ class MultiTaskModule(BaseModule):
         y_del = batch["DEL"]
         y_lc = batch["ESA_LC"]
         if self.mask_lc:
-            y_lc[y_del == 1] = 255
+            y_lc = y_lc.masked_fill(y_del == 1, 255)
         decode_out, auxiliary_out = self.model(x)
-        loss_decode = self.criterion_decode(decode_out.squeeze(1), y_del.float())
-        loss_auxiliary = self.criterion_auxiliary(auxiliary_out, y_lc.long())
+        decode_out = decode_out.squeeze(1)
+        y_del = self.resize_target(y_del, decode_out)
+        y_lc = self.resize_target(y_lc, decode_out).long()
+        loss_decode = self.decode_loss(decode_out, y_del)
+        loss_auxiliary = self.criterion_auxiliary(auxiliary_out, self.resize_target(y_lc, auxiliary_out))
         loss = loss_decode + self.aux_factor * loss_auxiliary
 
-        self.log("test_loss_del", loss_decode, on_step=True, on_epoch=True, prog_bar=True, logger=True)
-        self.log("test_loss_aux", loss_auxiliary, on_step=True, on_epoch=True, prog_bar=True, logger=True)
-        self.log("test_loss", loss, on_step=True, on_epoch=True, prog_bar=True, logger=True)
+        self.log_dict(
+            {"test_loss_del": loss_decode, "test_loss_aux": loss_auxiliary, "test_loss": loss},
+            on_step=False,
+            on_epoch=True,
+            prog_bar=True,
+            batch_size=x.shape[0],
+        )
         # compute delineation metrics
-        for metric_name, metric in self.test_metrics.items():
-            metric(decode_out.squeeze(1), y_del.float())
-            self.log(metric_name, metric, on_epoch=True, prog_bar=True)
+        preds_del = decode_out > 0
+        self.update_metric(self.test_metrics, preds_del, y_del)
         # compute auxiliary metrics
-        for metric_name, metric in self.test_metrics_aux.items():
-            metric(auxiliary_out, y_lc.long())
-            self.log(metric_name, metric, on_epoch=True, prog_bar=True)
+        preds_lc = self.resize_target(auxiliary_out.argmax(1), decode_out)
+        self.update_metric(self.test_metrics_aux, preds_lc, y_lc)
         return loss
 
+    def on_train_epoch_end(self) -> None:
+        super().on_train_epoch_end()
+        self.log_scores(self.train_metrics_aux, "train", suffix="_aux")
+
+    def on_validation_epoch_end(self) -> None:
+        super().on_validation_epoch_end()
+        self.log_scores(self.val_metrics_aux, "val", suffix="_aux")
+
+    def on_test_epoch_end(self) -> None:
+        super().on_test_epoch_end()
+        self.log_scores(self.test_metrics_aux, "test", suffix="_aux")
+
     def predict_step(self, batch: Any, batch_idx: int, dataloader_idx: int = 0) -> Any:
         full_image = batch["S2L2A"]
 
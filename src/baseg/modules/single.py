@@ -13,8 +13,9 @@ class SingleTaskModule(BaseModule):
         tiler: Callable[..., Any] | None = None,
         predict_callback: Callable[..., Any] | None = None,
         loss: str = "bce",
+        compile_model: bool = False,
     ):
-        super().__init__(config, tiler, predict_callback)
+        super().__init__(config, tiler, predict_callback, compile_model)
         if loss == "bce":
             self.criterion_decode = SoftBCEWithLogitsLoss(ignore_index=255, pos_weight=torch.tensor(3.0))
         else:
@@ -26,14 +27,14 @@ class SingleTaskModule(BaseModule):
 
         # lc = batch["ESA_LC"]
         # x = torch.cat([x, lc.unsqueeze(1)], dim=1)
-        decode_out = self.model(x)
-        loss_decode = self.criterion_decode(decode_out.squeeze(1), y_del.float())
+        decode_out = self.model(x).squeeze(1)
+        y_del = self.resize_target(y_del, decode_out)
+        loss_decode = self.decode_loss(decode_out, y_del)
         loss = loss_decode
 
-        self.log("train_loss", loss, on_step=True, prog_bar=True)
-        for metric_name, metric in self.train_metrics.items():
-            metric(decode_out.squeeze(1), y_del.float())
-            self.log(metric_name, metric, on_epoch=True, prog_bar=True)
+        self.log("train_loss", loss, on_step=False, on_epoch=True, prog_bar=True, batch_size=x.shape[0])
+        preds_del = decode_out > 0
+        self.update_metric(self.train_metrics, preds_del, y_del)
         return loss
 
     def validation_step(self, batch: Any, batch_idx: int):
@@ -41,14 +42,14 @@ class SingleTaskModule(BaseModule):
         y_del = batch["DEL"]
         # lc = batch["ESA_LC"]
         # x = torch.cat([x, lc.unsqueeze(1)], dim=1)
-        decode_out = self.model(x)
-        loss_decode = self.criterion_decode(decode_out.squeeze(1), y_del.float())
+        decode_out = self.model(x).squeeze(1)
+        y_del = self.resize_target(y_del, decode_out)
+        loss_decode = self.decode_loss(decode_out, y_del)
         loss = loss_decode
 
-        self.log("val_loss", loss, on_step=True, on_epoch=True, prog_bar=True)
-        for metric_name, metric in self.val_metrics.items():
-            metric(decode_out.squeeze(1), y_del.float())
-            self.log(metric_name, metric, on_epoch=True, prog_bar=True)
+        self.log("val_loss", loss, on_step=False, on_epoch=True, prog_bar=True, batch_size=x.shape[0])
+        preds_del = decode_out > 0
+        self.update_metric(self.val_metrics, preds_del, y_del)
         return loss
 
     def test_step(self, batch: Any, batch_idx: int):
@@ -56,14 +57,14 @@ class SingleTaskModule(BaseModule):
         y_del = batch["DEL"]
         # lc = batch["ESA_LC"]
         # x = torch.cat([x, lc.unsqueeze(1)], dim=1)
-        decode_out = self.model(x)
-        loss_decode = self.criterion_decode(decode_out.squeeze(1), y_del.float())
+        decode_out = self.model(x).squeeze(1)
+        y_del = self.resize_target(y_del, decode_out)
+        loss_decode = self.decode_loss(decode_out, y_del)
         loss = loss_decode
 
-        self.log("test_loss", loss, on_epoch=True, logger=True)
-        for metric_name, metric in self.test_metrics.items():
-            metric(decode_out.squeeze(1), y_del.float())
-            self.log(metric_name, metric, on_epoch=True, logger=True)
+        self.log("test_loss", loss, on_epoch=True, logger=True, batch_size=x.shape[0])
+        preds_del = decode_out > 0
+        self.update_metric(self.test_metrics, preds_del, y_del)
         return loss
 
     def predict_step(self, batch: Any, batch_idx: int, dataloader_idx: int = 0) -> Any:
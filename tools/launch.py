@@ -8,6 +8,7 @@ from mmengine import Config
 from pytorch_lightning import Trainer, seed_everything
 from pytorch_lightning.callbacks import ModelCheckpoint
 from pytorch_lightning.loggers import TensorBoardLogger
+from pytorch_lightning.strategies import DDPStrategy
 
 from baseg.datamodules import EMSDataModule
 from baseg.io import read_raster_profile, write_raster
@@ -41,8 +42,12 @@ def train(
     log.info("Preparing the model...")
     model_config = config["model"]
     loss = config["loss"] if "loss" in config else "bce"
+    compile_model = config["compile_model"] if "compile_model" in config else False
     module_class = MultiTaskModule if "aux_classes" in model_config["decode_head"] else SingleTaskModule
-    module = module_class(model_config, loss=loss, mask_lc=config["mask_lc"]) if "mask_lc" in config else module_class(model_config, loss=loss) 
+    module_opts = dict(loss=loss, compile_model=compile_model)
+    if "mask_lc" in config:
+        module_opts.update(mask_lc=config["mask_lc"])
+    module = module_class(model_config, **module_opts)
     module.init_pretrained()
 
     log.info("Preparing the trainer...")
@@ -60,7 +65,11 @@ def train(
             every_n_epochs=10,
         )
     ]
-    trainer = Trainer(**config["trainer"], callbacks=callbacks, logger=logger)
+    trainer_opts = dict(config["trainer"])
+    if trainer_opts.get("strategy") == "ddp":
+        # every parameter is used at every step: let DDP build the gradient buckets once and fuse the allreduces
+        trainer_opts.update(strategy=DDPStrategy(static_graph=True))
+    trainer = Trainer(**trainer_opts, callbacks=callbacks, logger=logger)
 
     log.info("Starting the training...")
     trainer.fit(module, datamodule=datamodule)
@@ -91,6 +100,7 @@ def test(
     datamodule = EMSDataModule(**config["data"])
 
     # prepare the model
+    # for multitask models, the auxiliary term of val_loss is computed at the decode head resolution
     checkpoint = checkpoint or find_best_checkpoint(models_path, "val_loss", "min")
     log.info(f"Using checkpoint: {checkpoint}")
 